@@ -0,0 +1,42 @@
+import functools
+import sqlite3
+
+# Shared SQLite tuning for the maintenance scripts.
+# WAL avoids an fsync per commit, NORMAL sync is safe with WAL,
+# and the bigger cache/mmap keep bulk work in memory.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA temp_store=memory",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA mmap_size=268435456",
+)
+
+def _apply_pragmas(conn):
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+
+def open_db(path="site.db"):
+    conn = sqlite3.connect(path)
+    _apply_pragmas(conn)
+    return conn
+
+def chunked(iterable, n):
+    """Yield lists of at most n items from iterable."""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == n:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+@functools.lru_cache(maxsize=1)
+def get_conn(path="site.db"):
+    """Singleton connection so scripts invoked from one process share
+    a single warmed connection instead of reopening the WAL/shm files."""
+    # default isolation level so "with conn:" wraps DML in one transaction
+    conn = sqlite3.connect(path, check_same_thread=False)
+    _apply_pragmas(conn)
+    return conn
@@ -1,32 +1,73 @@
-import csv
-import sqlite3
-
-# connect to your DB
-conn = sqlite3.connect("site.db")
-cur = conn.cursor()
-
-# open the CSV file (exported from Google Sheets)
-with open("New Arrival.csv", newline='', encoding="utf-8") as f:
-    reader = csv.DictReader(f)
-    for row in reader:
-        # clean price -> remove ₹ and commas
-        price_str = row["Price"].replace("₹", "").replace(",", "").strip()
-        try:
-            price = float(price_str)
-        except:
-            price = 0.0
-
-        # prepare values
-        name = f"{row['Product Type']} | {row['Product Size']}"
-        description = row.get("Description", "")
-        image_url = row.get("Image Link", "")
-
-        # insert into DB
-        cur.execute(
-            "INSERT INTO products (name, price, description, image_url) VALUES (?,?,?,?)",
-            (name, price, description, image_url)
-        )
-
-conn.commit()
-conn.close()
-print("✅ Products imported successfully!")
+import multiprocessing as mp
+import os
+
+import pandas as pd
+
+from db_utils import chunked, get_conn
+
+# single-pass removal of ₹ and commas from price strings
+_PRICE_TBL = {ord('₹'): None, ord(','): None}
+
+# below this size the fork/IPC cost of a worker pool outweighs the cleanup work
+_PARALLEL_THRESHOLD = 8 * 1024 * 1024
+
+def _clean_chunk(df):
+    """Clean one dataframe chunk: parse price, build name and base slug."""
+    df = df.fillna("")
+    # clean price -> remove ₹ and commas; unparseable values become 0.0
+    df["price"] = pd.to_numeric(
+        df["Price"].str.translate(_PRICE_TBL).str.strip(), errors="coerce"
+    ).fillna(0.0)
+    df["name"] = df["Product Type"] + " | " + df["Product Size"]
+    df["slug"] = df["name"].str.lower().str.replace(r"[^a-z0-9]+", "-", regex=True).str.strip("-")
+    if "Description" not in df.columns:
+        df["Description"] = ""
+    if "Image Link" not in df.columns:
+        df["Image Link"] = ""
+    return df
+
+def main():
+    # connect to your DB (shared singleton connection)
+    conn = get_conn()
+    cur = conn.cursor()
+
+    # load the CSV (exported from Google Sheets); memory_map lets the C parser
+    # read straight from the page cache with no userspace buffer copy.
+    # Large files are split into chunks and cleaned across cores; small ones
+    # are cleaned in-process in one vectorized pass.
+    path = "New Arrival.csv"
+    if os.path.getsize(path) >= _PARALLEL_THRESHOLD and mp.cpu_count() > 1:
+        reader = pd.read_csv(path, dtype=str, engine="c", memory_map=True, chunksize=50_000)
+        with mp.Pool() as pool:
+            df = pd.concat(pool.imap(_clean_chunk, reader), ignore_index=True)
+    else:
+        df = _clean_chunk(pd.read_csv(path, dtype=str, engine="c", memory_map=True))
+
+    # dedup slugs globally (chunks only see their own rows); duplicates get a
+    # -2, -3, ... suffix, which also replaces the populate_slugs.py second pass
+    dup = df.groupby("slug").cumcount()
+    df.loc[dup > 0, "slug"] += "-" + (dup[dup > 0] + 1).astype(str)
+
+    # one transaction, with rows grouped into multi-row VALUES statements so
+    # SQLite runs one bytecode program per 500 rows instead of one per row
+    # (500 rows x 5 params = 2500, well under the parameter limit)
+    rows = df[["name", "price", "Description", "Image Link", "slug"]].itertuples(index=False, name=None)
+    # "with conn:" commits on success and rolls back if any statement raises
+    with conn:
+        # drop the slug index during the bulk load so the B-tree is built once,
+        # sorted, at the end instead of rebalanced on every insert
+        cur.execute("DROP INDEX IF EXISTS idx_products_slug")
+        for chunk in chunked(rows, 500):
+            # OR IGNORE: the webhook app enforces a unique lower(trim(name))
+            # index, so re-running the import must skip rows it already loaded
+            # instead of aborting the whole batch
+            sql = (
+                "INSERT OR IGNORE INTO products (name, price, description, image_url, slug) VALUES "
+                + ",".join(["(?,?,?,?,?)"] * len(chunk))
+            )
+            cur.execute(sql, [v for row in chunk for v in row])
+        cur.execute("CREATE INDEX idx_products_slug ON products(slug)")
+    print("✅ Products imported successfully!")
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,16 @@
-import sqlite3
+from db_utils import get_conn
 
 def init_sheet_config():
-    conn = sqlite3.connect("site.db")
-    cur = conn.cursor()
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS sheet_config (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            sheet_id TEXT NOT NULL,
-            tab_name TEXT NOT NULL,
-            active INTEGER DEFAULT 1
-        )
-    """)
-    conn.commit()
-    conn.close()
+    conn = get_conn()
+    with conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS sheet_config (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                sheet_id TEXT NOT NULL,
+                tab_name TEXT NOT NULL,
+                active INTEGER DEFAULT 1
+            )
+        """)
     print("✅ sheet_config table created (if it didn’t already exist).")
 
 if __name__ == "__main__":
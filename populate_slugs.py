@@ -1,28 +1,29 @@
-import sqlite3
 import re
 
-def slugify(text):
-    text = text.lower().strip()
-    text = re.sub(r'[^a-z0-9]+', '-', text)
-    return text.strip('-')
+from db_utils import get_conn
+
+_SLUG_RE = re.compile(r'[^a-z0-9]+')
 
-# connect to your DB
-conn = sqlite3.connect("site.db")
-conn.row_factory = sqlite3.Row
-cur = conn.cursor()
+def slugify(text):
+    return _SLUG_RE.sub('-', text.lower().strip()).strip('-')
 
-# get all products
-cur.execute("SELECT id, name FROM products")
-products = cur.fetchall()
+def main():
+    # connect to your DB (shared singleton connection)
+    conn = get_conn()
+    cur = conn.cursor()
 
-for product in products:
-    pid = product["id"]
-    name = product["name"]
-    slug = slugify(name) + f"-{pid}"  # unique slug (name + id)
+    # stream rows straight off the cursor — no fetchall() materialization.
+    # updates stays a list because SQLite can't write on a connection while
+    # a SELECT cursor on it is still being iterated.
+    updates = [
+        (slugify(name) + f'-{pid}', pid)
+        for pid, name in cur.execute("SELECT id, name FROM products")
+    ]
 
-    cur.execute("UPDATE products SET slug = ? WHERE id = ?", (slug, pid))
-    print(f"Updated {name} -> {slug}")
+    # "with conn:" commits on success and rolls back if the batch raises
+    with conn:
+        cur.executemany("UPDATE products SET slug = ? WHERE id = ?", updates)
+    print(f"✅ Slugs populated for {len(updates)} products.")
 
-conn.commit()
-conn.close()
-print("✅ Slugs populated successfully.")
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,16 @@ import os
 import hmac
 import hashlib
 import json
+import io
+import queue
 import threading
 import time
 import sqlite3
 import csv
+from contextlib import contextmanager
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from flask import Flask, request, jsonify, render_template, redirect, url_for, flash
 from flask_login import (
     LoginManager, login_user, login_required, logout_user, UserMixin
@@ -20,9 +25,20 @@ from oauth2client.service_account import ServiceAccountCredentials
 from razorpay import Client
 import re
 
+_SLUG_RE = re.compile(r'[^a-z0-9]+')
+_PRICE_CLEAN_RE = re.compile(r'[^\d.]')
+
 def slugify(name):
     """Convert product name to a URL-friendly slug"""
-    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+    return _SLUG_RE.sub('-', name.lower()).strip('-')
+
+def _parse_price(raw):
+    """Parse a sheet/CSV price cell (may contain ₹, commas, junk) to float."""
+    s = _PRICE_CLEAN_RE.sub('', str(raw or ''))
+    try:
+        return float(s) if s else 0.0
+    except ValueError:  # e.g. lone '.' after cleaning
+        return 0.0
 
 # ------------------ CONFIG ------------------ #
 app = Flask(__name__)
@@ -36,12 +52,23 @@ TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "")
 RAZORPAY_KEY_ID = os.getenv("RAZORPAY_KEY_ID", "rzp_test_key")
 RAZORPAY_KEY_SECRET = os.getenv("RAZORPAY_KEY_SECRET", "rzp_test_secret")
 RZP_WEBHOOK_SECRET = os.getenv("RZP_WEBHOOK_SECRET", "test_secret")
+# encoded once at startup; hmac.new wants bytes and webhooks are hot
+RZP_WEBHOOK_SECRET_BYTES = RZP_WEBHOOK_SECRET.encode()
 
 # service account filename used consistently
 SERVICE_ACCOUNT_FILE = "google_credentials.json"
 
-# Initialize Razorpay client
-razorpay_client = Client(auth=(RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET))
+# shared outbound HTTP session: pooled keep-alive connections amortize the
+# TCP+TLS handshake across Razorpay, Telegram and any future API calls
+HTTP = requests.Session()
+HTTP.mount("https://", HTTPAdapter(
+    pool_connections=10, pool_maxsize=50,
+    max_retries=Retry(total=2, backoff_factor=0.1)
+))
+
+# Initialize Razorpay client on the shared session so order.create reuses
+# a warm connection to api.razorpay.com instead of a fresh TLS handshake
+razorpay_client = Client(auth=(RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET), session=HTTP)
 
 # ------------------ LOGIN ------------------ #
 login_manager = LoginManager()
@@ -58,49 +85,144 @@ def load_user(user_id):
 
 # ------------------ DATABASE ------------------ #
 DB_FILE = "site.db"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+
+# WAL lets /store readers run concurrently with admin writes; the rest are
+# per-connection settings so they are applied to every pooled handle
+_DB_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-40000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
 
-def get_db_connection():
-    conn = sqlite3.connect(DB_FILE, check_same_thread=False)
+def _new_connection():
+    conn = sqlite3.connect(DB_FILE, check_same_thread=False, isolation_level=None)
     conn.row_factory = sqlite3.Row
+    for pragma in _DB_PRAGMAS:
+        conn.execute(pragma)
     return conn
 
+# pre-opened connections shared by all request threads; opening per request
+# costs three openat() calls (db/-wal/-shm) plus pager setup every time.
+# NOTE: built at import, so gunicorn must NOT use --preload — SQLite handles
+# and the queue-draining daemon threads do not survive a fork; each worker
+# has to import this module itself (see Procfile.txt)
+_POOL = queue.Queue(maxsize=DB_POOL_SIZE)
+for _ in range(DB_POOL_SIZE):
+    _POOL.put(_new_connection())
+
+@contextmanager
+def db_conn():
+    """Borrow a pooled connection; it is returned to the pool on exit."""
+    conn = _POOL.get()
+    try:
+        yield conn
+    finally:
+        # never park a handle with an open write transaction: it would hold
+        # the WAL write lock and starve every later borrower
+        if conn.in_transaction:
+            conn.rollback()
+        _POOL.put(conn)
+
+# hot statements hoisted to module constants: SQLite's per-connection
+# statement cache keys on the exact SQL text, so reusing one literal keeps
+# the prepared plan warm across requests (and Python builds the string once)
+SQL_SELECT_ACTIVE_SHEETS = "SELECT sheet_id, tab_name FROM sheet_config WHERE active=1"
+SQL_SELECT_PRODUCTS = "SELECT id, name, slug, price, image_url, description, sizes FROM products"
+SQL_SELECT_PRODUCT_BY_ID = SQL_SELECT_PRODUCTS + " WHERE id=?"
+SQL_SELECT_PRODUCT_BY_SLUG = SQL_SELECT_PRODUCTS + " WHERE slug=?"
+SQL_INSERT_PRODUCT = ("INSERT OR IGNORE INTO products "
+                      "(name, price, description, image_url, source, slug) VALUES (?,?,?,?,?,?)")
+SQL_INSERT_ORDER = ("INSERT INTO orders "
+                    "(payment_id, order_id, status, amount, currency, raw_payload) VALUES (?,?,?,?,?,?)")
+
+# bump when the DDL below changes; init_db skips straight past the schema
+# setup once the DB's user_version matches
+SCHEMA_VERSION = 1
+
 def init_db():
-    conn = get_db_connection()
-    conn.execute(
-        """CREATE TABLE IF NOT EXISTS orders(
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            payment_id TEXT,
-            order_id TEXT,
-            status TEXT,
-            amount REAL,
-            currency TEXT,
-            raw_payload TEXT
-        )"""
-    )
-    conn.execute(
-        """CREATE TABLE IF NOT EXISTS products(
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            type TEXT,
-            sizes TEXT,
-            price REAL NOT NULL,
-            colors TEXT,
-            prints TEXT,
-            description TEXT,
-            image_url TEXT,
-            source TEXT DEFAULT 'db'
-        )"""
-    )
-    conn.execute(
-        """CREATE TABLE IF NOT EXISTS sheet_config(
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            sheet_id TEXT NOT NULL,
-            tab_name TEXT NOT NULL,
-            active INTEGER DEFAULT 0
-        )"""
-    )
-    conn.commit()
-    conn.close()
+    with db_conn() as conn:
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            return
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS orders(
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                payment_id TEXT,
+                order_id TEXT,
+                status TEXT,
+                amount REAL,
+                currency TEXT,
+                raw_payload TEXT
+            )"""
+        )
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS products(
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                type TEXT,
+                sizes TEXT,
+                price REAL NOT NULL,
+                colors TEXT,
+                prints TEXT,
+                description TEXT,
+                image_url TEXT,
+                source TEXT DEFAULT 'db',
+                slug TEXT
+            )"""
+        )
+        # existing DBs predate the slug column
+        try:
+            conn.execute("ALTER TABLE products ADD COLUMN slug TEXT")
+        except sqlite3.OperationalError:
+            pass  # already added
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS sheet_config(
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                sheet_id TEXT NOT NULL,
+                tab_name TEXT NOT NULL,
+                active INTEGER DEFAULT 0
+            )"""
+        )
+        # indexes for the hot filters; without them every lookup is a full scan.
+        # the unique lower(name) index also enforces the name dedup that used
+        # to be done by scanning the whole table into a Python set
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_products_source ON products(source)")
+        # a legacy DB may already hold duplicate names, which would make the
+        # unique index creation (and therefore app boot) fail. Never delete
+        # catalog rows in a migration: rename the newer duplicates with an
+        # id suffix (unique by construction) and log them for the operator
+        dups = conn.execute(
+            """SELECT id, name FROM products WHERE id NOT IN (
+                   SELECT MIN(id) FROM products GROUP BY lower(trim(name)))"""
+        ).fetchall()
+        if dups:
+            print(f"[WARN] {len(dups)} duplicate product name(s) renamed to satisfy the unique name index:")
+            for r in dups:
+                print(f"[WARN]   id={r['id']}: '{r['name']}' -> '{r['name'].strip()} ({r['id']})'")
+            conn.executemany(
+                "UPDATE products SET name = trim(name) || ' (' || id || ')', slug = slug || '-' || id WHERE id=?",
+                [(r["id"],) for r in dups]
+            )
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS uq_products_name_lower ON products(lower(trim(name)))")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sheet_config_active ON sheet_config(sheet_id, active)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_products_slug ON products(slug)")
+        # backfill slugs for rows inserted before the column existed
+        missing = conn.execute("SELECT id, name FROM products WHERE slug IS NULL OR slug=''").fetchall()
+        if missing:
+            conn.executemany(
+                "UPDATE products SET slug=? WHERE id=?",
+                [(slugify(r["name"]), r["id"]) for r in missing]
+            )
+        conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        conn.commit()
+
+# run at import so schema setup happens at worker boot, not serially behind
+# the first request; the user_version check makes repeat runs a no-op
+init_db()
+
 def find_product_by_key(product_key):
     """
     Unified lookup:
@@ -117,9 +239,8 @@ def find_product_by_key(product_key):
         except ValueError:
             return None
 
-        conn = get_db_connection()
-        row = conn.execute("SELECT * FROM products WHERE id=?", (pid,)).fetchone()
-        conn.close()
+        with db_conn() as conn:
+            row = conn.execute("SELECT * FROM products WHERE id=?", (pid,)).fetchone()
 
         if not row:
             return None
@@ -141,41 +262,60 @@ def find_product_by_key(product_key):
 
 
 # ------------------ HELPERS ------------------ #
+# Telegram sends happen on a background worker so a slow or stalled
+# Telegram endpoint never adds latency to webhook/admin responses
+_TG_QUEUE = queue.Queue()
+
+def _telegram_worker():
+    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+    while True:
+        msg = _TG_QUEUE.get()
+        data = {"chat_id": TELEGRAM_CHAT_ID, "text": msg, "parse_mode": "Markdown"}
+        try:
+            HTTP.post(url, data=data, timeout=5)
+        except Exception as e:
+            print("Telegram error:", e)
+        finally:
+            _TG_QUEUE.task_done()
+
+threading.Thread(target=_telegram_worker, daemon=True).start()
+
 def send_telegram_message(msg: str):
     if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
         return
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    data = {"chat_id": TELEGRAM_CHAT_ID, "text": msg, "parse_mode": "Markdown"}
-    try:
-        requests.post(url, data=data, timeout=5)
-    except Exception as e:
-        print("Telegram error:", e)
+    _TG_QUEUE.put(msg)
 
 def normalize_prices_in_db():
-    conn = get_db_connection()
-    rows = conn.execute("SELECT id, price FROM products").fetchall()
-    converted = 0
-    for r in rows:
-        try:
-            p = float(r["price"])
-        except Exception:
-            continue
-        if p >= 10000 and abs(round(p) % 100) == 0:
-            new_price = p / 100.0
-            conn.execute("UPDATE products SET price=? WHERE id=?", (new_price, r["id"]))
-            converted += 1
-    if converted > 0:
-        print(f"Normalized {converted} prices from paise -> rupees in the DB.")
-    conn.commit()
-    conn.close()
+    with db_conn() as conn:
+        # set-based: the engine tests and updates every row in one statement
+        cur = conn.execute(
+            "UPDATE products SET price = price/100.0 "
+            "WHERE price >= 10000 AND (CAST(ROUND(price) AS INTEGER) % 100) = 0"
+        )
+        if cur.rowcount > 0:
+            print(f"Normalized {cur.rowcount} prices from paise -> rupees in the DB.")
+        conn.commit()
 
 # --------------- Sheet cache & client helpers ---------------
 # TTL in seconds (default 300s = 5 minutes). You can override with env var SHEET_CACHE_TTL.
 CACHE_TTL = int(os.getenv("SHEET_CACHE_TTL", "300"))
 
 # in-memory caches + locks
-SHEET_CACHE = {}  # key -> {"ts": float, "data": list}
+SHEET_CACHE = {}  # key -> {"ts": float, "data": list} or {"err_ts": float}
 SHEET_CACHE_LOCK = threading.Lock()
+SHEET_LOCKS = {}  # key -> per-(sheet, tab) fetch lock (single flight)
+NEGATIVE_TTL = 30  # seconds before a failed sheet fetch is retried
+# only fetch the columns we actually read; keeps the values payload narrow
+SHEET_FETCH_RANGE = os.getenv("SHEET_FETCH_RANGE", "A1:H")
+# on-disk copy of the aggregated store view; lets a restarted process serve
+# /store immediately instead of waiting on the first Sheets round-trip
+SNAPSHOT_FILE = os.getenv("PRODUCTS_SNAPSHOT_FILE", "products_snapshot.json")
+# worksheet handles; open_by_key is itself a Drive API round-trip
+WS_CACHE = {}
+WS_CACHE_LOCK = threading.Lock()
+# aggregated /store view (per active sheet config) + slug lookup index
+STORE_VIEW_CACHE = {"ts": 0.0, "key": None, "data": None, "slugs": None}
+STORE_VIEW_LOCK = threading.Lock()
 GSPREAD_CLIENT = None
 GSPREAD_CLIENT_LOCK = threading.Lock()
 
@@ -222,48 +362,218 @@ def get_gspread_client():
             return None
 
 
+def _cached_sheet_entry(key, now):
+    """Return (hit, data) for a cache entry that is still fresh."""
+    entry = SHEET_CACHE.get(key)
+    if not entry:
+        return False, None
+    if "err_ts" in entry:
+        # negative cache: don't re-hit a failing sheet on every request
+        if now - entry["err_ts"] < NEGATIVE_TTL:
+            return True, []
+        return False, None
+    if now - entry["ts"] < CACHE_TTL:
+        return True, entry["data"]
+    return False, None
+
+
 def get_sheet_records(sheet_id, tab_name):
-    """Return cached sheet records if fresh, otherwise fetch and cache."""
+    """Return cached sheet records if fresh, otherwise fetch and cache.
+
+    Only one thread per (sheet, tab) refetches on expiry; the rest wait on
+    the per-key lock and pick up the fresh entry, avoiding a stampede of
+    identical API calls when the TTL rolls over.
+    """
     key = f"{sheet_id}::{tab_name}"
     now = time.time()
 
-    # check cache
+    # check cache and grab the per-key fetch lock
     with SHEET_CACHE_LOCK:
-        entry = SHEET_CACHE.get(key)
-        if entry and (now - entry["ts"] < CACHE_TTL):
-            return entry["data"]
+        hit, data = _cached_sheet_entry(key, now)
+        if hit:
+            return data
+        fetch_lock = SHEET_LOCKS.setdefault(key, threading.Lock())
 
-    # not cached or expired — fetch
-    client = get_gspread_client()
-    if not client:
-        print(f"[ERROR] Cannot authenticate Google Sheets client for sheet {sheet_id}")
-        return []  # still return empty, but log
+    with fetch_lock:
+        # re-check after acquiring: another thread may have just fetched
+        with SHEET_CACHE_LOCK:
+            hit, data = _cached_sheet_entry(key, time.time())
+            if hit:
+                return data
 
-    try:
-        sh = client.open_by_key(sheet_id)
-        ws = sh.worksheet(tab_name)
-        data = ws.get_all_records() or []
-        if not data:
-            print(f"[INFO] Sheet {sheet_id} tab '{tab_name}' fetched 0 rows")
-        else:
-            print(f"[INFO] Sheet {sheet_id} tab '{tab_name}' fetched {len(data)} rows")
+        client = get_gspread_client()
+        if not client:
+            print(f"[ERROR] Cannot authenticate Google Sheets client for sheet {sheet_id}")
+            return []  # still return empty, but log
 
-        with SHEET_CACHE_LOCK:
-            SHEET_CACHE[key] = {"ts": now, "data": data}
-        return data
+        try:
+            with WS_CACHE_LOCK:
+                ws = WS_CACHE.get(key)
+            if ws is None:
+                sh = client.open_by_key(sheet_id)
+                ws = sh.worksheet(tab_name)
+                with WS_CACHE_LOCK:
+                    WS_CACHE[key] = ws
+            # one narrow batch_get + local zip instead of get_all_records(),
+            # which fetches every column and issues an extra header request.
+            # A1:H covers all the columns the app reads (Product Type, Price,
+            # Description, Image Link, size/color/print variants).
+            ranges = ws.batch_get([SHEET_FETCH_RANGE], major_dimension="ROWS")
+            raw = (ranges[0] if ranges else []) or []
+            if raw:
+                headers = raw[0]
+                data = [dict(zip(headers, row)) for row in raw[1:]]
+            else:
+                data = []
+            if not data:
+                print(f"[INFO] Sheet {sheet_id} tab '{tab_name}' fetched 0 rows")
+            else:
+                print(f"[INFO] Sheet {sheet_id} tab '{tab_name}' fetched {len(data)} rows")
 
-    except Exception as e:
-        print(f"[ERROR] Exception fetching sheet {sheet_id} tab '{tab_name}': {e}")
-        return []
+            # precompute the slug->record map so lookups are one hash probe
+            by_slug = {}
+            for rec in data:
+                rec_name = (rec.get("Product Type") or rec.get("Product") or "").strip()
+                if rec_name:
+                    by_slug.setdefault(slugify(rec_name), rec)
+
+            with SHEET_CACHE_LOCK:
+                SHEET_CACHE[key] = {"ts": time.time(), "data": data, "by_slug": by_slug}
+            return data
+
+        except Exception as e:
+            print(f"[ERROR] Exception fetching sheet {sheet_id} tab '{tab_name}': {e}")
+            with WS_CACHE_LOCK:
+                WS_CACHE.pop(key, None)  # handle may be stale (renamed/deleted tab)
+            with SHEET_CACHE_LOCK:
+                SHEET_CACHE[key] = {"err_ts": time.time()}
+            return []
+
+
+def get_sheet_slug_map(sheet_id, tab_name):
+    """Return the cached slug->record map for one tab (possibly empty)."""
+    get_sheet_records(sheet_id, tab_name)  # ensure the cache is fresh
+    with SHEET_CACHE_LOCK:
+        entry = SHEET_CACHE.get(f"{sheet_id}::{tab_name}") or {}
+        return entry.get("by_slug", {})
+
+
+def get_store_view(active_rows):
+    """Return (sheets_data, slug_index) aggregated across the active tabs.
+
+    The aggregation is cached for CACHE_TTL and keyed by the active sheet
+    config, so /store and product lookups don't rebuild it per request.
+    """
+    key = tuple(sorted((r["sheet_id"], r["tab_name"]) for r in active_rows))
+    now = time.time()
+    with STORE_VIEW_LOCK:
+        if (STORE_VIEW_CACHE["data"] is not None
+                and STORE_VIEW_CACHE["key"] == key
+                and now - STORE_VIEW_CACHE["ts"] < CACHE_TTL):
+            return STORE_VIEW_CACHE["data"], STORE_VIEW_CACHE["slugs"]
+
+    sheets_data = {}   # tab_name -> list of product dicts
+    slug_index = {}    # slug -> product dict
+    for sheet_id, tab_name in key:
+        try:
+            raw = get_sheet_records(sheet_id, tab_name)  # fast when cached
+            products_dict = {}  # aggregate by product name
+
+            for rec in raw:
+                name = (rec.get("Product Type") or rec.get("Product") or "").strip()
+                if not name:
+                    continue
+
+                price = _parse_price(rec.get("Price"))
+
+                size = (rec.get("Product Size") or "").strip()
+                colors = (rec.get("Color Variants") or "").strip()
+                prints = (rec.get("Print Variants") or "").strip()
+                image_url = (rec.get("Image Link") or "").strip() or "https://via.placeholder.com/300x300.png?text=No+Image"
+                description = (rec.get("Description") or "").strip()
+
+                if name in products_dict:
+                    if size and size not in products_dict[name]["sizes"]:
+                        products_dict[name]["sizes"].append(size)
+                else:
+                    products_dict[name] = {
+                        "id": len(products_dict) + 1,
+                        "slug": slugify(name),
+                        "name": name,
+                        "price": price,
+                        "image_url": image_url,
+                        "description": description,
+                        "sizes": [size] if size else [],
+                        "colors": colors,
+                        "prints": prints
+                    }
+
+            sheets_data[tab_name] = list(products_dict.values())
+            for product in products_dict.values():
+                slug_index.setdefault(product["slug"], product)
+
+        except Exception as e:
+            # keep the same behavior: log error and show empty list for this tab
+            print(f"Error processing sheet {sheet_id} tab {tab_name}: {e}")
+            sheets_data[tab_name] = []
+
+    with STORE_VIEW_LOCK:
+        STORE_VIEW_CACHE.update(ts=now, key=key, data=sheets_data, slugs=slug_index)
+    return sheets_data, slug_index
+
+
+def refresh_snapshot(force=False):
+    """Rebuild the store view and persist it to SNAPSHOT_FILE atomically."""
+    with db_conn() as conn:
+        active_rows = conn.execute(SQL_SELECT_ACTIVE_SHEETS).fetchall()
+    if force:
+        with STORE_VIEW_LOCK:
+            STORE_VIEW_CACHE["ts"] = 0.0
+    sheets_data, slug_index = get_store_view(active_rows)
+    snapshot = {
+        "ts": time.time(),
+        "key": [[r["sheet_id"], r["tab_name"]] for r in active_rows],
+        "data": sheets_data,
+        "slugs": slug_index,
+    }
+    # write-to-tmp + rename so readers never see a half-written file
+    tmp = SNAPSHOT_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f)
+    os.replace(tmp, SNAPSHOT_FILE)
+    return sheets_data
+
+
+def _load_snapshot():
+    """Seed the store-view cache from the last on-disk snapshot, if any.
+
+    A stale snapshot still seeds the cache: get_store_view sees the old ts
+    and refetches, but until then /store has something to serve."""
+    try:
+        with open(SNAPSHOT_FILE, encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return
+    with STORE_VIEW_LOCK:
+        if STORE_VIEW_CACHE["data"] is None:
+            STORE_VIEW_CACHE.update(
+                ts=snapshot.get("ts", 0.0),
+                key=tuple(sorted(tuple(pair) for pair in snapshot.get("key", []))),
+                data=snapshot.get("data") or {},
+                slugs=snapshot.get("slugs") or {},
+            )
+
+_load_snapshot()
 
 
 
 # ------------------ GOOGLE SHEETS SYNC ------------------ #
 def sync_products_from_sheet():
     print("Fetching rows from Google Sheet...")
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    creds = ServiceAccountCredentials.from_json_keyfile_name(SERVICE_ACCOUNT_FILE, scope)
-    client = gspread.authorize(creds)
+    client = get_gspread_client()
+    if not client:
+        print("Cannot authenticate Google Sheets client; aborting sync.")
+        return
     SHEET_ID = os.getenv("SHEET_ID", "")
     TAB_NAME = os.getenv("SHEET_TAB", "")
     if not SHEET_ID or not TAB_NAME:
@@ -286,56 +596,44 @@ def sync_products_from_sheet():
         return
     headers = [h.strip() for h in all_rows[0]]
     data_rows = all_rows[1:]
-    conn = get_db_connection()
-    conn.execute("DELETE FROM products WHERE source='sheet'")
-    seen = set([r['name'].strip().lower() for r in conn.execute("SELECT name FROM products").fetchall()])
-    inserted = 0
-    for row in data_rows:
-        if not any(cell.strip() for cell in row):
-            continue
-        row_dict = dict(zip(headers, row))
-        name = (row_dict.get("Product Type") or "").strip()
-        if not name:
-            continue
-        n = name.lower()
-        if n in seen:
-            continue
-        seen.add(n)
-        price_raw = str(row_dict.get("Price") or "0").replace("₹", "").strip()
-        try:
-            price = float(price_raw)
-        except:
-            price = 0.0
-        size = row_dict.get("Product Size") or ""
-        colors = row_dict.get("Color Variants") or ""
-        prints = row_dict.get("Print Variants") or ""
-        description = row_dict.get("Description") or ""
-        full_description = f"{description}\nSizes: {size}\nColors: {colors}\nPrints: {prints}"
-        image_url = row_dict.get("Image Link") or None
-        conn.execute(
-            "INSERT INTO products (name, price, description, image_url, source) VALUES (?,?,?,?,?)",
-            (name, price, full_description, image_url, "sheet")
+    with db_conn() as conn:
+        rows_to_insert = []
+        for row in data_rows:
+            if not any(cell.strip() for cell in row):
+                continue
+            row_dict = dict(zip(headers, row))
+            name = (row_dict.get("Product Type") or "").strip()
+            if not name:
+                continue
+            price = _parse_price(row_dict.get("Price"))
+            size = row_dict.get("Product Size") or ""
+            colors = row_dict.get("Color Variants") or ""
+            prints = row_dict.get("Print Variants") or ""
+            description = row_dict.get("Description") or ""
+            full_description = f"{description}\nSizes: {size}\nColors: {colors}\nPrints: {prints}"
+            image_url = row_dict.get("Image Link") or None
+            rows_to_insert.append((name, price, full_description, image_url, "sheet", slugify(name)))
+        # one write transaction: the delete plus a single executemany.
+        # the unique lower(name) index drops duplicates via OR IGNORE
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM products WHERE source='sheet'")
+        before = conn.total_changes
+        conn.executemany(
+            SQL_INSERT_PRODUCT,
+            rows_to_insert
         )
-        inserted += 1
-    conn.commit()
-    conn.close()
+        inserted = conn.total_changes - before
+        conn.commit()
     print(f"✅ Synced {inserted} products from Google Sheet")
 
 # --------- Google Sheets helper (consistent credentials) ---------
 def get_sheet_tabs(sheet_id):
-    """Return all worksheet names for a given sheet ID using GOOGLE_CREDENTIALS env var"""
+    """Return all worksheet names for a given sheet ID using the cached client"""
     try:
-        scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-        
-        creds_json = os.getenv("GOOGLE_CREDENTIALS")
-        if not creds_json:
-            print("❌ GOOGLE_CREDENTIALS not set in environment")
+        client = get_gspread_client()
+        if not client:
             return []
 
-        creds_dict = json.loads(creds_json)
-        creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-        client = gspread.authorize(creds)
-
         sh = client.open_by_key(sheet_id)
         return [ws.title for ws in sh.worksheets()]
     except Exception as e:
@@ -367,19 +665,32 @@ def logout():
     logout_user()
     return redirect(url_for("login"))
 
+ADMIN_PAGE_SIZE = 50  # orders per admin page
+
 @app.route("/admin")
 @login_required
 def admin_dashboard():
-    conn = get_db_connection()
-    payments = conn.execute("SELECT * FROM orders ORDER BY id DESC").fetchall()
-    conn.close()
-    total_revenue = sum(row["amount"] for row in payments)
+    page = max(request.args.get("page", 1, type=int) or 1, 1)
+    with db_conn() as conn:
+        # aggregates in SQL: one scan instead of shipping every row to Python
+        total_orders, total_revenue, last_payment_amount = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(amount), 0), "
+            "COALESCE((SELECT amount FROM orders ORDER BY id DESC LIMIT 1), 0) "
+            "FROM orders"
+        ).fetchone()
+        payments = conn.execute(
+            "SELECT id, payment_id, order_id, status, amount, currency "
+            "FROM orders ORDER BY id DESC LIMIT ? OFFSET ?",
+            (ADMIN_PAGE_SIZE, (page - 1) * ADMIN_PAGE_SIZE),
+        ).fetchall()
     return render_template(
         "admin_dashboard.html",
         payments=payments,
         total_revenue=total_revenue,
-        total_orders=len(payments),
-        last_payment_amount=payments[0]["amount"] if payments else 0
+        total_orders=total_orders,
+        last_payment_amount=last_payment_amount,
+        page=page,
+        has_next=page * ADMIN_PAGE_SIZE < total_orders
     )
 
 # ------------------------------
@@ -391,7 +702,6 @@ def admin_dashboard():
 @app.route("/admin/products", methods=["GET", "POST"])
 @login_required
 def admin_products():
-    conn = get_db_connection()
     # ----- Manual Add -----
     if request.method == "POST":
         name = (request.form.get("name") or "").strip()
@@ -406,44 +716,48 @@ def admin_products():
             price_val = float(price_raw)
         except Exception:
             price_val = 0.0
-        conn.execute(
-            """INSERT INTO products (name, type, sizes, price, colors, prints, description, image_url, source)
-            VALUES (?,?,?,?,?,?,?,?,?)""",
-            (name, type_, sizes, price_val, colors, prints, description, image_url, "db")
-        )
-        conn.commit()
+        try:
+            with db_conn() as conn:
+                conn.execute(
+                    """INSERT INTO products (name, type, sizes, price, colors, prints, description, image_url, source, slug)
+                    VALUES (?,?,?,?,?,?,?,?,?,?)""",
+                    (name, type_, sizes, price_val, colors, prints, description, image_url, "db", slugify(name))
+                )
+                conn.commit()
+        except sqlite3.IntegrityError:
+            # unique lower(trim(name)) index: same name already exists
+            flash(f"❌ A product named '{name}' already exists.", "danger")
+            return redirect(url_for("admin_products"))
         flash("Product added successfully!", "success")
         return redirect(url_for("admin_products"))
-    # ----- Fetch DB products -----
-    db_products = conn.execute("SELECT * FROM products ORDER BY id DESC").fetchall()
-    # ----- Fetch Google Sheets products -----
-    sheets_products = []
+    # ----- Fetch DB products only; sheet data is lazy-loaded via JSON -----
+    with db_conn() as conn:
+        db_products = conn.execute("SELECT * FROM products ORDER BY id DESC").fetchall()
+    return render_template("admin_products.html", products=db_products)
+
+# ------------------------------
+# Sheets products as JSON (served from the cached aggregation)
+# ------------------------------
+@app.route("/admin/products/sheets.json")
+@login_required
+def admin_products_sheets():
+    with db_conn() as conn:
+        active_rows = conn.execute(SQL_SELECT_ACTIVE_SHEETS).fetchall()
+    sheets_data, _ = get_store_view(active_rows)
+    return jsonify(sheets_data)
+
+# ------------------------------
+# Force-refresh the on-disk products snapshot
+# ------------------------------
+@app.route("/admin/refresh_snapshot", methods=["POST"])
+@login_required
+def admin_refresh_snapshot():
     try:
-        sheets_data = fetch_sheets_data() # {tab_name: [products]}
-        for tab_name, products in sheets_data.items():
-            for p in products:
-                try:
-                    price_val = float(str(p.get("price") or "0").replace("₹","").split()[0])
-                except:
-                    price_val = 0.0
-                sheets_products.append({
-                    "id": f"sheet_{tab_name}_{p.get('name','unknown')}", # pseudo-ID
-                    "name": p.get("name","Unknown"),
-                    "type": p.get("type","-"),
-                    "sizes": p.get("sizes","-"),
-                    "price": price_val,
-                    "colors": p.get("colors","-"),
-                    "prints": p.get("prints","-"),
-                    "description": p.get("description","-"),
-                    "image_url": p.get("image_url",""),
-                    "source": f"sheet:{tab_name}"
-                })
+        refresh_snapshot(force=True)
+        flash("✅ Products snapshot refreshed.")
     except Exception as e:
-        flash(f"Failed to fetch sheets: {e}", "danger")
-    # ----- Combine DB + Sheets -----
-    all_products = list(db_products) + sheets_products
-    conn.close()
-    return render_template("admin_products.html", products=all_products)
+        flash(f"❌ Snapshot refresh failed: {e}")
+    return redirect(url_for("admin_products"))
 
 # ------------------------------
 # Edit product (DB only)
@@ -451,33 +765,35 @@ def admin_products():
 @app.route("/admin/products/edit/<int:product_id>", methods=["GET", "POST"])
 @login_required
 def edit_product(product_id):
-    conn = get_db_connection()
-    product = conn.execute("SELECT * FROM products WHERE id=?", (product_id,)).fetchone()
-    if not product:
-        conn.close()
-        return "Product not found", 404
-    if request.method == "POST":
-        name = (request.form.get("name") or "").strip()
-        type_ = (request.form.get("type") or "").strip()
-        sizes = (request.form.get("sizes") or "").strip()
-        price_raw = request.form.get("price") or "0"
-        colors = (request.form.get("colors") or "").strip()
-        prints = (request.form.get("prints") or "").strip()
-        description = (request.form.get("description") or "").strip()
-        image_url = (request.form.get("image_url") or "").strip()
-        try:
-            price_val = float(price_raw)
-        except:
-            price_val = 0.0
-        conn.execute(
-            """UPDATE products SET name=?, type=?, sizes=?, price=?, colors=?, prints=?, description=?, image_url=? WHERE id=?""",
-            (name, type_, sizes, price_val, colors, prints, description, image_url, product_id)
-        )
-        conn.commit()
-        conn.close()
-        flash("Product updated successfully!", "success")
-        return redirect(url_for("admin_products"))
-    conn.close()
+    with db_conn() as conn:
+        product = conn.execute("SELECT * FROM products WHERE id=?", (product_id,)).fetchone()
+        if not product:
+            return "Product not found", 404
+        if request.method == "POST":
+            name = (request.form.get("name") or "").strip()
+            type_ = (request.form.get("type") or "").strip()
+            sizes = (request.form.get("sizes") or "").strip()
+            price_raw = request.form.get("price") or "0"
+            colors = (request.form.get("colors") or "").strip()
+            prints = (request.form.get("prints") or "").strip()
+            description = (request.form.get("description") or "").strip()
+            image_url = (request.form.get("image_url") or "").strip()
+            try:
+                price_val = float(price_raw)
+            except:
+                price_val = 0.0
+            try:
+                conn.execute(
+                    """UPDATE products SET name=?, type=?, sizes=?, price=?, colors=?, prints=?, description=?, image_url=?, slug=? WHERE id=?""",
+                    (name, type_, sizes, price_val, colors, prints, description, image_url, slugify(name), product_id)
+                )
+                conn.commit()
+            except sqlite3.IntegrityError:
+                # unique lower(trim(name)) index: renamed onto an existing product
+                flash(f"❌ Another product named '{name}' already exists.", "danger")
+                return redirect(url_for("edit_product", product_id=product_id))
+            flash("Product updated successfully!", "success")
+            return redirect(url_for("admin_products"))
     return render_template("edit_product.html", product=product)
 
 # ------------------------------
@@ -486,10 +802,9 @@ def edit_product(product_id):
 @app.route("/admin/products/delete/<int:product_id>", methods=["GET", "POST"])
 @login_required
 def delete_product(product_id):
-    conn = get_db_connection()
-    conn.execute("DELETE FROM products WHERE id=?", (product_id,))
-    conn.commit()
-    conn.close()
+    with db_conn() as conn:
+        conn.execute("DELETE FROM products WHERE id=?", (product_id,))
+        conn.commit()
     flash("Product deleted successfully!", "success")
     return redirect(url_for("admin_products"))
 
@@ -510,38 +825,38 @@ def sync_products():
 @app.route("/admin/sheets", methods=["GET", "POST"])
 @login_required
 def manage_sheets():
-    conn = get_db_connection()
-    cur = conn.cursor()
     if request.method == "POST":
         sheet_id = request.form.get("sheet_id", "").strip()
         selected_tabs = request.form.getlist("tabs") # multiple selection possible
-        if sheet_id:
-            # Fetch existing entries for this sheet
-            existing_rows = cur.execute("SELECT * FROM sheet_config WHERE sheet_id=?", (sheet_id,)).fetchall()
-            existing_tab_names = [r["tab_name"] for r in existing_rows]
-            # Update existing rows: activate if selected, deactivate if not selected
-            for r in existing_rows:
-                if r["tab_name"] in selected_tabs:
-                    cur.execute("UPDATE sheet_config SET active=1 WHERE id=?", (r["id"],))
-                else:
-                    cur.execute("UPDATE sheet_config SET active=0 WHERE id=?", (r["id"],))
-            # Insert any newly selected tabs that are not yet in DB
-            for tab in selected_tabs:
-                if tab not in existing_tab_names:
-                    cur.execute(
-                        "INSERT INTO sheet_config (sheet_id, tab_name, active) VALUES (?, ?, 1)", (sheet_id, tab)
+        with db_conn() as conn:
+            if sheet_id:
+                conn.execute("BEGIN IMMEDIATE")
+                existing = {r["tab_name"] for r in conn.execute(
+                    "SELECT tab_name FROM sheet_config WHERE sheet_id=?", (sheet_id,))}
+                # one set-based UPDATE: activate selected tabs, deactivate the rest
+                if selected_tabs:
+                    placeholders = ",".join("?" * len(selected_tabs))
+                    conn.execute(
+                        f"UPDATE sheet_config SET active = CASE WHEN tab_name IN ({placeholders}) THEN 1 ELSE 0 END WHERE sheet_id=?",
+                        (*selected_tabs, sheet_id)
                     )
-        conn.commit()
-        conn.close()
+                else:
+                    conn.execute("UPDATE sheet_config SET active=0 WHERE sheet_id=?", (sheet_id,))
+                # one batched INSERT for newly selected tabs
+                conn.executemany(
+                    "INSERT INTO sheet_config (sheet_id, tab_name, active) VALUES (?, ?, 1)",
+                    [(sheet_id, tab) for tab in selected_tabs if tab not in existing]
+                )
+            conn.commit()
         return redirect(url_for("manage_sheets"))
     # GET: fetch all saved sheet rows for display
-    sheets = cur.execute("SELECT * FROM sheet_config").fetchall()
+    with db_conn() as conn:
+        sheets = conn.execute("SELECT * FROM sheet_config").fetchall()
     # Build a mapping sheet_id -> list of active tab names for the template (helps preselect)
     active_map = {}
     for s in sheets:
         if s["active"] == 1:
             active_map.setdefault(s["sheet_id"], []).append(s["tab_name"])
-    conn.close()
     # render template with 'sheets' and 'active_map'
     return render_template("manage_sheets.html", sheets=sheets, active_map=active_map)
 
@@ -553,9 +868,8 @@ def get_tabs():
         return jsonify({"tabs": [], "active": []})
     tabs = get_sheet_tabs(sheet_id)
     # Also fetch currently active tabs (if any) for this sheet from DB
-    conn = get_db_connection()
-    rows = conn.execute("SELECT tab_name FROM sheet_config WHERE sheet_id=? AND active=1", (sheet_id,)).fetchall()
-    conn.close()
+    with db_conn() as conn:
+        rows = conn.execute("SELECT tab_name FROM sheet_config WHERE sheet_id=? AND active=1", (sheet_id,)).fetchall()
     active = [r["tab_name"] for r in rows]
     return jsonify({"tabs": tabs, "active": active})
 
@@ -564,18 +878,18 @@ def get_tabs():
 def store():
     sheets_data = {}   # tab_name -> list of product dicts
 
-    # load active tabs from DB and manual products in a single connection
-    conn = get_db_connection()
-    active_rows = conn.execute("SELECT sheet_id, tab_name FROM sheet_config WHERE active=1").fetchall()
-    db_products = conn.execute("SELECT * FROM products").fetchall()
-    conn.close()
+    # load active tabs from DB and manual products in a single connection;
+    # only the columns the template uses, not SELECT *
+    with db_conn() as conn:
+        active_rows = conn.execute(SQL_SELECT_ACTIVE_SHEETS).fetchall()
+        db_products = conn.execute(SQL_SELECT_PRODUCTS).fetchall()
 
     # prepare manual products (fast)
     manual_products = []
     for p in db_products:
         manual_products.append({
             "id": p["id"],
-            "slug": slugify(p["name"]),
+            "slug": p["slug"] or slugify(p["name"]),
             "name": p["name"],
             "price": p["price"],
             "image_url": p["image_url"] or "https://via.placeholder.com/300x300.png?text=No+Image",
@@ -595,55 +909,7 @@ def store():
             razorpay_key=RAZORPAY_KEY_ID
         )
 
-    # For each active sheet/tab use the cached fetch function
-    for row in active_rows:
-        sheet_id = row["sheet_id"]
-        tab_name = row["tab_name"]
-        try:
-            raw = get_sheet_records(sheet_id, tab_name)  # fast when cached
-            products_dict = {}  # aggregate by product name
-
-            for rec in raw:
-                name = (rec.get("Product Type") or rec.get("Product") or "").strip()
-                if not name:
-                    continue
-
-                price_raw = str(rec.get("Price") or "").replace("₹", "").replace(",", "").strip()
-                try:
-                    price = float(price_raw) if price_raw else 0.0
-                except ValueError:
-                    import re
-                    digits = re.sub(r"[^\d.]", "", price_raw)
-                    price = float(digits) if digits else 0.0
-
-                size = (rec.get("Product Size") or "").strip()
-                colors = (rec.get("Color Variants") or "").strip()
-                prints = (rec.get("Print Variants") or "").strip()
-                image_url = (rec.get("Image Link") or "").strip() or "https://via.placeholder.com/300x300.png?text=No+Image"
-                description = (rec.get("Description") or "").strip()
-
-                if name in products_dict:
-                    if size and size not in products_dict[name]["sizes"]:
-                        products_dict[name]["sizes"].append(size)
-                else:
-                    products_dict[name] = {
-                        "id": len(products_dict) + 1,
-                        "slug": slugify(name),
-                        "name": name,
-                        "price": price,
-                        "image_url": image_url,
-                        "description": description,
-                        "sizes": [size] if size else [],
-                        "colors": colors,
-                        "prints": prints
-                    }
-
-            sheets_data[tab_name] = list(products_dict.values())
-
-        except Exception as e:
-            # keep the same behavior: log error and show empty list for this tab
-            print(f"Error processing sheet {sheet_id} tab {tab_name}: {e}")
-            sheets_data[tab_name] = []
+    sheets_data, _ = get_store_view(active_rows)
 
     return render_template(
         "store.html",
@@ -663,63 +929,44 @@ def find_product_by_key(product_key):
     2) Active Google Sheets tabs
     Returns a dict with normalized keys or None
     """
-    # --- 1. Check manual DB products ---
-    conn = get_db_connection()
-    db_rows = conn.execute("SELECT * FROM products").fetchall()
-    conn.close()
-
-    for p in db_rows:
-        slug = slugify(p["name"])
-        if product_key == slug or product_key == f"db_{p['id']}":
-            return {
-                "id": p["id"],
-                "name": p["name"],
-                "slug": slug,
-                "price": p["price"],
-                "image_url": p["image_url"] or "https://via.placeholder.com/300x300.png?text=No+Image",
-                "description": p["description"] or "No description available",
-                "sizes": [p["sizes"]] if p["sizes"] else [],
-                "colors": "",
-                "prints": ""
-            }
-
-    # --- 2. Check Sheets products ---
-    conn = get_db_connection()
-    active_rows = conn.execute("SELECT sheet_id, tab_name FROM sheet_config WHERE active=1").fetchall()
-    conn.close()
+    # both queries on one borrowed connection instead of two round trips
+    with db_conn() as conn:
+        # --- 1. Check manual DB products: one indexed lookup, no Python scan ---
+        if product_key.startswith("db_"):
+            try:
+                pid = int(product_key[3:])
+            except ValueError:
+                pid = None
+            p = conn.execute(
+                SQL_SELECT_PRODUCT_BY_ID,
+                (pid,)
+            ).fetchone() if pid is not None else None
+        else:
+            p = conn.execute(
+                SQL_SELECT_PRODUCT_BY_SLUG,
+                (product_key,)
+            ).fetchone()
+        active_rows = conn.execute(SQL_SELECT_ACTIVE_SHEETS).fetchall()
+
+    if p:
+        return {
+            "id": p["id"],
+            "name": p["name"],
+            "slug": p["slug"] or slugify(p["name"]),
+            "price": p["price"],
+            "image_url": p["image_url"] or "https://via.placeholder.com/300x300.png?text=No+Image",
+            "description": p["description"] or "No description available",
+            "sizes": [p["sizes"]] if p["sizes"] else [],
+            "colors": "",
+            "prints": ""
+        }
 
-    for row in active_rows:
-        sheet_data = get_sheet_records(row["sheet_id"], row["tab_name"])
-        for rec in sheet_data:
-            name = (rec.get("Product Type") or rec.get("Product") or "").strip()
-            if not name:
-                continue
-            slug = slugify(name)
-            if slug == product_key:
-                size = (rec.get("Product Size") or "").strip()
-                colors = (rec.get("Color Variants") or "").strip()
-                prints = (rec.get("Print Variants") or "").strip()
-                image_url = (rec.get("Image Link") or "").strip() or "https://via.placeholder.com/300x300.png?text=No+Image"
-                description = (rec.get("Description") or "").strip() or "No description available"
-                price_raw = str(rec.get("Price") or "").replace("₹", "").replace(",", "").strip()
-                try:
-                    price = float(price_raw) if price_raw else 0.0
-                except ValueError:
-                    import re
-                    digits = re.sub(r"[^\d.]", "", price_raw)
-                    price = float(digits) if digits else 0.0
-
-                return {
-                    "id": None,
-                    "name": name,
-                    "slug": slug,
-                    "price": price,
-                    "image_url": image_url,
-                    "description": description,
-                    "sizes": [size] if size else [],
-                    "colors": colors,
-                    "prints": prints
-                }
+    # --- 2. Check Sheets products via the cached aggregated view ---
+    _, slug_index = get_store_view(active_rows)
+    product = slug_index.get(product_key)
+    if product:
+        # copy so route-level setdefault tweaks don't mutate the cache
+        return dict(product)
 
     # Not found
     return None
@@ -752,125 +999,163 @@ def upload_csv():
     filename = secure_filename(file.filename)
     if not filename.endswith(".csv"):
         return "Only CSV files are allowed", 400
-    stream = file.stream.read().decode("utf-8").splitlines()
+    # decode lazily off the upload stream; no full-file copy in memory
+    stream = io.TextIOWrapper(file.stream, encoding="utf-8", newline="")
     reader = csv.DictReader(stream)
-    conn = get_db_connection()
-    seen = set([r['name'].strip().lower() for r in conn.execute("SELECT name FROM products").fetchall()])
+    rows_to_insert = []
     for row in reader:
         name = row.get("Product Type") or row.get("name") or ""
-        norm = name.lower()
-        if norm in seen or not name:
+        if not name:
             continue
-        seen.add(norm)
-        price_raw = row.get("Price", "0").replace("₹", "").strip()
-        try:
-            price = float(price_raw)
-        except:
-            price = 0.0
+        price = _parse_price(row.get("Price"))
         description = row.get("Description", "")
         image_url = row.get("Image Link") or None
-        conn.execute(
-            "INSERT INTO products (name, price, description, image_url, source) VALUES (?,?,?,?,?)",
-            (name, price, description, image_url, "csv")
+        rows_to_insert.append((name, price, description, image_url, "csv", slugify(name)))
+    with db_conn() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            SQL_INSERT_PRODUCT,
+            rows_to_insert
         )
-    conn.commit()
-    conn.close()
+        conn.commit()
     return redirect(url_for("admin_products"))
 
 @app.route("/admin/payments")
 @login_required
 def admin_payments():
-    conn = get_db_connection()
-    payments = conn.execute("SELECT * FROM orders ORDER BY id DESC").fetchall()
-    conn.close()
-    return render_template("admin_payments.html", payments=payments)
+    page = max(request.args.get("page", 1, type=int) or 1, 1)
+    with db_conn() as conn:
+        total_orders = conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+        payments = conn.execute(
+            "SELECT id, payment_id, order_id, status, amount, currency "
+            "FROM orders ORDER BY id DESC LIMIT ? OFFSET ?",
+            (ADMIN_PAGE_SIZE, (page - 1) * ADMIN_PAGE_SIZE),
+        ).fetchall()
+    return render_template(
+        "admin_payments.html",
+        payments=payments,
+        page=page,
+        has_next=page * ADMIN_PAGE_SIZE < total_orders
+    )
 
 # Delete all products
 @app.route('/delete_all_products', methods=['POST'])
 @login_required
 def delete_all_products():
     try:
-        conn = get_db_connection()
-        conn.execute("DELETE FROM products")
-        conn.commit()
-        conn.close()
+        with db_conn() as conn:
+            conn.execute("DELETE FROM products")
+            conn.commit()
         flash("✅ All products deleted successfully!", "success")
     except Exception as e:
         flash(f"❌ Error deleting products: {e}", "danger")
     return redirect(url_for("admin_products"))
 
 # Razorpay webhook
+MAX_WEBHOOK_BODY = 1024 * 1024  # 1 MB; real Razorpay payloads are far smaller
+
+# order persistence + notification happen off the request thread so webhook
+# responses are not limited by DB or Telegram latency
+_ORDER_QUEUE = queue.Queue()
+
+def _order_worker():
+    while True:
+        data, raw_payload = _ORDER_QUEUE.get()
+        try:
+            pay = data.get("payload", {}).get("payment", {}).get("entity", {})
+            amount_paise = pay.get("amount", 0)
+            amount_inr = amount_paise / 100.0
+            pid = pay.get("id")
+            oid = pay.get("order_id")
+            status = pay.get("status", "unknown")
+            description = pay.get("description", "")
+            safe_description = description[:255]
+            with db_conn() as conn:
+                conn.execute(
+                    SQL_INSERT_ORDER,
+                    (pid, oid, status, amount_inr, pay.get("currency", "INR"), raw_payload),
+                )
+                conn.commit()
+            msg = (
+                f"*Razorpay Payment Alert!*\n\n"
+                f"📌 Event: {data.get('event')}\n"
+                f"🆔 Payment ID: {pid}\n"
+                f"🛍️ Order ID: {oid or 'Not Linked'}\n"
+                f"💰 Amount: ₹{amount_inr:.2f} INR\n"
+                f"✅ Status: *{status.upper()}*\n"
+                f"📝 Description: {safe_description}"
+            )
+            send_telegram_message(msg)
+        except Exception as e:
+            print("Order worker error:", e)
+        finally:
+            _ORDER_QUEUE.task_done()
+
+threading.Thread(target=_order_worker, daemon=True).start()
+
 @app.route("/razorpay_webhook", methods=["POST"])
 def razorpay_webhook():
-    body = request.data
+    # reject oversized posts before buffering the body
+    if (request.content_length or 0) > MAX_WEBHOOK_BODY:
+        return "Payload too large", 413
     sig = request.headers.get("X-Razorpay-Signature")
     if not sig:
         return "Missing signature", 400
-    exp = hmac.new(RZP_WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
-    verified = hmac.compare_digest(exp, sig)
+    body = request.data
+    # compare raw 32-byte digests: no hex encode of ours, and bytes.fromhex
+    # rejects malformed headers (and normalizes case) before the comparison
+    try:
+        received = bytes.fromhex(sig)
+    except ValueError:
+        return "bad signature", 400
+    expected = hmac.new(RZP_WEBHOOK_SECRET_BYTES, body, hashlib.sha256).digest()
+    if not hmac.compare_digest(expected, received):
+        # forged/garbage signatures cost one SHA-256, not a DB write + alert
+        return "bad signature", 401
     data = request.get_json()
-    pay = data.get("payload", {}).get("payment", {}).get("entity", {})
-    amount_paise = pay.get("amount", 0)
-    amount_inr = amount_paise / 100.0
-    pid = pay.get("id")
-    oid = pay.get("order_id")
-    status = pay.get("status", "unknown")
-    description = pay.get("description", "")
-    safe_description = description[:255]
-    conn = get_db_connection()
-    conn.execute(
-        "INSERT INTO orders(payment_id,order_id,status,amount,currency,raw_payload) VALUES (?,?,?,?,?,?)",
-        (pid, oid, status, amount_inr, pay.get("currency", "INR"), json.dumps(data)),
-    )
-    conn.commit()
-    conn.close()
-    msg = (
-        f"*Razorpay Payment Alert!*\n\n"
-        f"📌 Event: {data.get('event')}\n"
-        f"🆔 Payment ID: {pid}\n"
-        f"🛍️ Order ID: {oid or 'Not Linked'}\n"
-        f"💰 Amount: ₹{amount_inr:.2f} INR\n"
-        f"✅ Status: *{status.upper()}*\n"
-        f"📝 Description: {safe_description}"
-    )
-    send_telegram_message(msg)
-    return jsonify({"ok": verified})
-
-def get_product_by_id(product_id):
-    # Try Google Sheets first
-    conn = get_db_connection()
-    active_rows = conn.execute("SELECT sheet_id, tab_name FROM sheet_config WHERE active=1").fetchall()
-    conn.close()
-    if active_rows:
-        try:
-            scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-            creds = ServiceAccountCredentials.from_json_keyfile_name(SERVICE_ACCOUNT_FILE, scope)
-            client = gspread.authorize(creds)
-            for row in active_rows:
-                sheet_id = row["sheet_id"]
-                tab_name = row["tab_name"]
-                try:
-                    sh = client.open_by_key(sheet_id)
-                    ws = sh.worksheet(tab_name)
-                    raw = ws.get_all_records()
-                    for idx, rec in enumerate(raw, start=1):
-                        if idx == product_id:
-                            return {
-                                "id": idx,
-                                "name": (rec.get("Product Type") or rec.get("Product") or "").strip(),
-                                "price": float(str(rec.get("Price") or "0").replace("₹","").replace(",","") or 0),
-                                "description": (rec.get("Description") or "").strip()
-                            }
-                except Exception as e:
-                    print(f"Error loading tab {tab_name}: {e}")
-        except Exception as e:
-            print("Sheets fetch error:", e)
-    # Fallback to DB
-    conn = get_db_connection()
-    product = conn.execute("SELECT * FROM products WHERE id=?", (product_id,)).fetchone()
-    conn.close()
+    # store the bytes we HMAC'd verbatim instead of re-serializing the parse
+    _ORDER_QUEUE.put((data, body.decode("utf-8", errors="replace")))
+    return jsonify({"ok": True})
+
+def get_product_by_id(product_key):
+    """Resolve a product by stable key: a slug, 'db_<id>', or (legacy) a
+    1-based sheet row number.
+
+    Positional numbers shift meaning whenever a sheet row is inserted, so
+    callers should pass slugs; the integer path is kept for compatibility.
+    """
+    if isinstance(product_key, str) and not product_key.isdigit():
+        # slug / db_<id>: one hash probe or indexed seek, stable under edits
+        return find_product_by_key(product_key)
+
+    row_no = int(product_key)
+    with db_conn() as conn:
+        active_rows = conn.execute(SQL_SELECT_ACTIVE_SHEETS).fetchall()
+    for row in active_rows:
+        # served from the TTL cache; O(1) index instead of an enumerate scan
+        raw = get_sheet_records(row["sheet_id"], row["tab_name"])
+        if 1 <= row_no <= len(raw):
+            rec = raw[row_no - 1]
+            return {
+                "id": row_no,
+                "name": (rec.get("Product Type") or rec.get("Product") or "").strip(),
+                "price": _parse_price(rec.get("Price")),
+                "description": (rec.get("Description") or "").strip()
+            }
+    # Fallback to DB by primary key (stable)
+    with db_conn() as conn:
+        product = conn.execute("SELECT * FROM products WHERE id=?", (row_no,)).fetchone()
     return dict(product) if product else None
 
+# recent successful order creations; a double-click or network retry within
+# the TTL reuses the same Razorpay order instead of creating a fresh one.
+# keyed by the client's idempotency token — never product alone, since a
+# Razorpay order is single-use and must not be shared between customers
+ORDER_CACHE_TTL = 120  # seconds
+_ORDER_CACHE = {}      # (idem_key, product_key, amount_paise) -> (ts, order)
+_ORDER_CACHE_LOCK = threading.Lock()
+_ORDER_CACHE_MAX = 1024
+
 @app.route("/create_order/<product_key>", methods=["POST"])
 def create_order(product_key):
     # Lookup product (DB or Google Sheets)
@@ -901,20 +1186,44 @@ def create_order(product_key):
         "notes": {"description": safe_description}
     }
 
-    try:
-        razorpay_order = razorpay_client.order.create(data=order_data)
-    except Exception as e:
-        return jsonify({"error": f"Razorpay order creation failed: {e}"}), 500
-
-    # --- Telegram message for ALL products (manual + sheets) ---
-    msg = (
-        f"💰 *New Order Created*\n"
-        f"📦 Product: {product.get('name', 'Unknown')}\n"
-        f"💵 Price: ₹{product_price:.2f}\n"
-        f"🗂 Type: {'Manual/DB' if product_key.startswith('db_') else 'Google Sheets'}\n"
-        f"🆔 Order ID: {razorpay_order.get('id')}"
-    )
-    send_telegram_message(msg)
+    # dedupe only for retries the client itself marks: without the token,
+    # two customers buying the same product would get the same single-use
+    # order id and the second payment would be rejected by Razorpay
+    idem_key = request.headers.get("X-Idempotency-Key")
+    cache_key = (idem_key, product_key, amount_paise) if idem_key else None
+    now = time.time()
+    hit = None
+    if cache_key:
+        with _ORDER_CACHE_LOCK:
+            hit = _ORDER_CACHE.get(cache_key)
+    if hit and now - hit[0] < ORDER_CACHE_TTL:
+        # idempotent retry: same token/product/amount within the TTL -> same
+        # order, no second Razorpay round-trip and no duplicate alert
+        razorpay_order = hit[1]
+    else:
+        # everything except the order id is known before the outbound call;
+        # prep the alert now so Razorpay's RTT is the only work left after
+        msg_prefix = (
+            f"💰 *New Order Created*\n"
+            f"📦 Product: {product.get('name', 'Unknown')}\n"
+            f"💵 Price: ₹{product_price:.2f}\n"
+            f"🗂 Type: {'Manual/DB' if product_key.startswith('db_') else 'Google Sheets'}\n"
+        )
+        try:
+            razorpay_order = razorpay_client.order.create(data=order_data)
+        except Exception as e:
+            return jsonify({"error": f"Razorpay order creation failed: {e}"}), 500
+        if cache_key:
+            with _ORDER_CACHE_LOCK:
+                if len(_ORDER_CACHE) >= _ORDER_CACHE_MAX:
+                    cutoff = now - ORDER_CACHE_TTL
+                    for k in [k for k, (ts, _) in _ORDER_CACHE.items() if ts < cutoff]:
+                        del _ORDER_CACHE[k]
+                _ORDER_CACHE[cache_key] = (time.time(), razorpay_order)
+
+        # --- Telegram message for ALL products (manual + sheets) ---
+        # the send itself happens on the background worker queue
+        send_telegram_message(msg_prefix + f"🆔 Order ID: {razorpay_order.get('id')}")
 
     return jsonify({
         "order_id": razorpay_order.get("id"),
@@ -929,70 +1238,85 @@ def create_order(product_key):
 @app.route("/admin/clear_history", methods=["POST"])
 @login_required
 def clear_history():
-    conn = get_db_connection()
-    conn.execute("DELETE FROM orders")
-    conn.commit()
-    conn.close()
+    with db_conn() as conn:
+        conn.execute("DELETE FROM orders")
+        conn.commit()
     return redirect(url_for("admin_dashboard"))
 
 def find_product_by_slug(slug):
     slug = slug.lower()
     # First check Google Sheets aggregated products
-    conn = get_db_connection()
-    active_rows = conn.execute("SELECT sheet_id, tab_name FROM sheet_config WHERE active=1").fetchall()
-    conn.close()
-    if active_rows:
-        try:
-            scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-            creds = ServiceAccountCredentials.from_json_keyfile_name(SERVICE_ACCOUNT_FILE, scope)
-            client = gspread.authorize(creds)
-            for row in active_rows:
-                sh = client.open_by_key(row["sheet_id"])
-                ws = sh.worksheet(row["tab_name"])
-                raw = ws.get_all_records()
-                for rec in raw:
-                    name = (rec.get("Product Type") or rec.get("Product") or "").strip()
-                    if slugify(name) == slug:
-                        price_raw = str(rec.get("Price") or "0").replace("₹","").replace(",","").strip()
-                        try:
-                            price = float(price_raw)
-                        except:
-                            price = 0.0
-                        size = (rec.get("Product Size") or "").strip()
-                        colors = (rec.get("Color Variants") or "").strip()
-                        prints = (rec.get("Print Variants") or "").strip()
-                        image_url = (rec.get("Image Link") or "").strip()
-                        description = (rec.get("Description") or "").strip()
-                        return {
-                            "slug": slug,
-                            "name": name,
-                            "price": price,
-                            "image_url": image_url,
-                            "description": description,
-                            "sizes": [size] if size else [],
-                            "colors": colors,
-                            "prints": prints
-                        }
-        except:
-            pass
-    # Fallback DB
-    conn = get_db_connection()
-    rows = conn.execute("SELECT * FROM products").fetchall()
-    conn.close()
-    for p in rows:
-        if slugify(p['name']) == slug:
-            p = dict(p)
-            p['sizes'] = [] # DB has no sizes
-            p['slug'] = slug
-            return p
+    with db_conn() as conn:
+        active_rows = conn.execute(SQL_SELECT_ACTIVE_SHEETS).fetchall()
+    for row in active_rows:
+        # one hash probe in the cached slug map instead of a row scan
+        rec = get_sheet_slug_map(row["sheet_id"], row["tab_name"]).get(slug)
+        if rec:
+            name = (rec.get("Product Type") or rec.get("Product") or "").strip()
+            size = (rec.get("Product Size") or "").strip()
+            colors = (rec.get("Color Variants") or "").strip()
+            prints = (rec.get("Print Variants") or "").strip()
+            image_url = (rec.get("Image Link") or "").strip()
+            description = (rec.get("Description") or "").strip()
+            return {
+                "slug": slug,
+                "name": name,
+                "price": _parse_price(rec.get("Price")),
+                "image_url": image_url,
+                "description": description,
+                "sizes": [size] if size else [],
+                "colors": colors,
+                "prints": prints
+            }
+    # Fallback DB: one indexed seek on the stored slug column
+    with db_conn() as conn:
+        p = conn.execute("SELECT * FROM products WHERE slug=? LIMIT 1", (slug,)).fetchone()
+    if p:
+        p = dict(p)
+        p['sizes'] = [] # DB has no sizes
+        p['slug'] = slug
+        return p
     return None
 
 # ------------------ STARTUP ------------------ #
+def _prewarm_caches():
+    """Warm the Sheets client and per-tab/store caches, then keep them warm.
+
+    Runs just before the TTL expires and evicts near-expiry entries so the
+    refetch happens here instead of on a user request."""
+    while True:
+        try:
+            get_gspread_client()
+            with db_conn() as conn:
+                active_rows = conn.execute(SQL_SELECT_ACTIVE_SHEETS).fetchall()
+            now = time.time()
+            for row in active_rows:
+                key = f"{row['sheet_id']}::{row['tab_name']}"
+                with SHEET_CACHE_LOCK:
+                    entry = SHEET_CACHE.get(key)
+                    if entry and "ts" in entry and now - entry["ts"] > CACHE_TTL - 60:
+                        del SHEET_CACHE[key]
+                get_sheet_records(row["sheet_id"], row["tab_name"])
+            with STORE_VIEW_LOCK:
+                STORE_VIEW_CACHE["ts"] = 0.0
+            refresh_snapshot()  # rebuilds the store view and persists it
+        except Exception as e:
+            print("Cache prewarm error:", e)
+        time.sleep(max(CACHE_TTL - 30, 30))
+
+# started at import, like the order/Telegram workers, so every gunicorn
+# worker keeps its caches (and the on-disk snapshot) warm — not just the
+# dev server
+threading.Thread(target=_prewarm_caches, daemon=True).start()
+
 if __name__ == "__main__":
-    init_db()
+    # schema setup already ran at import; just normalize and serve
     try:
         normalize_prices_in_db()
     except Exception as e:
         print("Price normalization failed:", e)
     port = int(os.environ.get("PORT", 5000))
-    app.run(host="0.0.0.0", port=port, debug=True)
+    # dev server only; production runs under gunicorn (see Procfile.txt).
+    # debug (reloader + single-threaded) must be opted into explicitly
+    debug = os.environ.get("FLASK_DEBUG", "").lower() in ("1", "true", "yes")
+    app.run(host="0.0.0.0", port=port, debug=debug)